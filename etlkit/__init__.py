@@ -6,9 +6,27 @@ Extract, Transform, Load Kit
 #class Transformers:
 #	from ._wranglers import FieldHistoryWrangler
 import logging
+import os
 logging.\
 	basicConfig(level=logging.INFO,
 #			format='%(asctime)s: %(levelname)s ==== %(filename)s:%(module)s:%(funcName)s: %(message)s',
 			format='%(asctime)s: ETLkit - %(levelname)s ==== %(module)s: %(message)s',
 			datefmt='%H:%M:%S')
 
+#______________________________________________________________________________#
+def configure() -> None:
+	"""
+	Load the .env file into the environment. Only the first call in a process
+	reads the file; later calls (and child processes) are no-ops.
+	"""
+	if os.getenv('_ETLKIT_ENV_LOADED'):
+		return None
+	from dotenv import load_dotenv
+	load_dotenv()
+	os.environ['_ETLKIT_ENV_LOADED'] = '1'
+
+#______________________________________________________________________________#
+def getenv(key: str) -> str | None:
+	"""Get an environment variable, after loading the .env file."""
+	configure()
+	return os.getenv(key)
@@ -2,21 +2,12 @@
 Base classes for ETL kit.
 """
 
-import os
 from abc import ABC, abstractmethod
 from pandas import DataFrame
-from dotenv import load_dotenv
 from typing import Callable, Protocol
-from . import logging
+from . import logging, getenv
 from .containers import Config, Data
 
-#_____ GLOBALS _____#
-load_dotenv()
-# Are we running locally or in the cloud?
-LOCATION     = os.getenv('LOCATION')
-PROJECT_ID   = os.getenv('GOOGLE_CLOUD_PROJECT_ID')
-ENVIRONMENT  = os.getenv('ENVIRONMENT')
-
 
 
 #================================================================================#
@@ -82,19 +73,14 @@ class BaseLoad(ABC):
 		Load the data.
 		"""
 
-		# Check the table name is not empty
-		if config.table_name == '':
-			raise ValueError("Table name cannot be empty.")
-
-		# Check the dataset name is not empty
-		if config.dataset_name == '':
-			raise ValueError("Dataset name cannot be empty.")
+		# Check the table and dataset names are not empty
+		config.check_destination()
 
 		# Check the data is a dataframe
 		if not isinstance(df, DataFrame):
 			raise TypeError(f"Expected a dataframe, got {type(df)}")
 
-		# Check the data has a column called "Unique_ID"
+		# Check the data has a column called "Unique_ID" (a hashed lookup on the index)
 		if 'Unique_ID' not in df.columns:
 			raise KeyError("Expected a column called 'Unique_ID' in the output dataframe.")
 
@@ -106,7 +92,8 @@ class BaseLoad(ABC):
 		self.update_mode  = config.update_mode
 		self.table_name   = config.table_name
 		self.dataset_name = config.dataset_name
-		full_table_name   = f"{PROJECT_ID}.{self.dataset_name}.{self.table_name}"
+		project_id        = getenv('GOOGLE_CLOUD_PROJECT_ID')
+		full_table_name   = f"{project_id}.{self.dataset_name}.{self.table_name}"
 		self.load(df, full_table_name)
 #================================================================================#
 
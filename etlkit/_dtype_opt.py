@@ -0,0 +1,55 @@
+"""
+Helpers for shrinking the memory footprint of extracted dataframes.
+"""
+
+import numpy as np
+from typing import Tuple, Type
+from pandas import DataFrame, to_numeric
+
+#_____ GLOBALS _____#
+# Signed integer types to try, smallest first
+INT_LADDER: Tuple[Type[np.signedinteger], ...] = (np.int8, np.int16, np.int32)
+# Object columns with a lower unique fraction than this become categoricals
+CATEGORY_THRESHOLD = 0.5
+
+
+
+#================================================================================#
+def optimize_dataframe(df: DataFrame) -> DataFrame:
+	"""
+	Downcast the columns of a dataframe to the smallest dtypes that hold them:
+	- integers go to the smallest of int8 / int16 / int32 that fits the range.
+	- floats go to float32 where possible.
+	- low-cardinality object columns become categoricals.
+
+	Returns a new dataframe; the input is not modified.
+	"""
+	# A shallow copy is enough: converted columns are assigned as new columns,
+	# so the input's data is never written to
+	df = df.copy(deep=False)
+	n_rows = len(df)
+
+	for col in df.columns:
+		series = df[col]
+		kind   = series.dtype.kind
+
+		# Integers: walk up the ladder until the range fits
+		if kind == 'i' and n_rows > 0:
+			col_min, col_max = series.min(), series.max()
+			for int_type in INT_LADDER:
+				info = np.iinfo(int_type)
+				if info.min <= col_min and col_max <= info.max:
+					df[col] = series.astype(int_type)
+					break
+
+		# Floats
+		elif kind == 'f':
+			df[col] = to_numeric(series, downcast='float')
+
+		# Strings / mixed objects
+		elif kind == 'O' and n_rows > 0:
+			if series.nunique() / n_rows < CATEGORY_THRESHOLD:
+				df[col] = series.astype('category')
+
+	return df
+#================================================================================#
@@ -0,0 +1,18 @@
+"""
+Numba-compiled kernels for fast element-wise work on numeric columns.
+"""
+
+from numba import njit, prange
+
+
+
+#================================================================================#
+@njit(parallel=True, cache=True)
+def apply_1d(fn, arr, out):
+	"""
+	Apply `fn` to each element of `arr`, writing the results into `out`. The loop
+	is split across cores. `fn` must itself be compiled with `numba.njit`.
+	"""
+	for i in prange(arr.shape[0]):
+		out[i] = fn(arr[i])
+#================================================================================#
@@ -0,0 +1,123 @@
+"""
+Helpers for writing dataframes to BigQuery through the Storage Write API, which
+takes rows as protobuf messages.
+"""
+
+import re
+import pandas as pd
+
+
+#================================================================================#
+class UnsupportedSchemaError(ValueError):
+	"""Raised when a table's schema can't be written through the Storage Write API."""
+
+# BigQuery column types that map directly onto protobuf field types
+PROTO_TYPES = {
+	'STRING':    'TYPE_STRING',
+	'INTEGER':   'TYPE_INT64',
+	'INT64':     'TYPE_INT64',
+	'FLOAT':     'TYPE_DOUBLE',
+	'FLOAT64':   'TYPE_DOUBLE',
+	'BOOLEAN':   'TYPE_BOOL',
+	'BOOL':      'TYPE_BOOL',
+	'TIMESTAMP': 'TYPE_INT64', # microseconds since the epoch
+}
+_PROTO_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+#______________________________________________________________________________#
+def proto_row_class(schema: list) -> tuple:
+	"""
+	Build a protobuf message class matching a BigQuery table schema, for the
+	Storage Write API. Returns the message descriptor and the message class.
+	"""
+	from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+	descriptor = descriptor_pb2.DescriptorProto(name='Row')
+	for number, field in enumerate(schema, start=1):
+		if field.field_type not in PROTO_TYPES or field.mode == 'REPEATED':
+			raise UnsupportedSchemaError(f"column {field.name} has type {field.field_type}")
+		if not _PROTO_NAME_RE.match(field.name):
+			raise UnsupportedSchemaError(f"column name '{field.name}' isn't a valid proto field name")
+		descriptor.field.add(name=field.name, number=number,
+													type=getattr(descriptor_pb2.FieldDescriptorProto, PROTO_TYPES[field.field_type]),
+													label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL)
+
+	file_proto = descriptor_pb2.FileDescriptorProto(name='etlkit_row.proto', package='etlkit',
+																								syntax='proto2')
+	file_proto.message_type.add().CopyFrom(descriptor)
+	pool = descriptor_pool.DescriptorPool()
+	pool.Add(file_proto)
+	row_class = message_factory.GetMessageClass(pool.FindMessageTypeByName('etlkit.Row'))
+	return descriptor, row_class
+
+#______________________________________________________________________________#
+def _to_bool(value) -> bool:
+	"""Convert a value to a bool, accepting 'true' / 'false' strings (any case)."""
+	if isinstance(value, str):
+		lowered = value.strip().lower()
+		if lowered not in ('true', 'false', '1', '0'):
+			raise ValueError(f"can't convert '{value}' to a boolean")
+		return lowered in ('true', '1')
+	return bool(value)
+
+#______________________________________________________________________________#
+def proto_frame(df: pd.DataFrame, schema: list) -> pd.DataFrame:
+	"""
+	Validate a dataframe against a table schema, and convert each column to the
+	type of its proto field (timestamps as microseconds since the epoch), kept in
+	nullable pandas dtypes. String frames, like those from the bulk extractor, are
+	converted too; empty strings in non-STRING columns count as nulls.
+
+	Raises UnsupportedSchemaError if the dataframe has a column that isn't in the
+	table, or a value can't be converted, so nothing is sent in either case.
+	"""
+	fields  = {field.name: field for field in schema}
+	unknown = [col for col in df.columns if col not in fields]
+	if unknown:
+		raise UnsupportedSchemaError(f"columns {unknown} aren't in the table")
+
+	columns = {}
+	for name in df.columns:
+		field_type = fields[name].field_type
+		values = df[name]
+		if field_type != 'STRING' and values.dtype == object:
+			values = values.where(values != '')
+		try:
+			if field_type == 'STRING':
+				values = values.where(values.isna(), values.astype(str)).astype('string')
+			elif field_type == 'TIMESTAMP':
+				values = pd.to_datetime(values, utc=True)
+				values = ((values - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(microseconds=1)).astype('Int64')
+			elif PROTO_TYPES[field_type] == 'TYPE_INT64':
+				numbers = pd.to_numeric(values, errors='raise')
+				if not (numbers.dropna() % 1 == 0).all():
+					raise ValueError("non-integer values")
+				values = numbers.astype('Int64')
+			elif PROTO_TYPES[field_type] == 'TYPE_DOUBLE':
+				values = pd.to_numeric(values, errors='raise').astype('Float64')
+			else:
+				values = values.map(_to_bool, na_action='ignore').astype('boolean')
+		except (TypeError, ValueError, OverflowError) as e:
+			raise UnsupportedSchemaError(
+				f"column {name} has values that can't be written as {field_type}: {e}") from e
+		columns[name] = values
+
+	return pd.DataFrame({name: values.array for name, values in columns.items()})
+
+#______________________________________________________________________________#
+def serialize_rows(typed: pd.DataFrame, row_class) -> list:
+	"""
+	Serialise the rows of a (converted) dataframe as protobuf messages, leaving
+	out nulls.
+	"""
+	columns = [(name, typed[name].tolist(), typed[name].isna().to_numpy())
+							for name in typed.columns]
+	rows = []
+	for i in range(len(typed)):
+		row = row_class()
+		for name, values, nulls in columns:
+			if not nulls[i]:
+				setattr(row, name, values[i])
+		rows.append(row.SerializeToString())
+	return rows
+#================================================================================#
@@ -1,13 +1,8 @@
-import os
-import dotenv
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from numpy.typing import DTypeLike
 from pandas import DataFrame, Timestamp, Timedelta
-from . import logging
-
-#_____ GLOBALS _____#
-dotenv.load_dotenv()
-ENVIRONMENT = os.getenv('ENVIRONMENT')
-LOCATION    = os.getenv('LOCATION')
+from . import logging, getenv
 
 
 #================================================================================#
@@ -21,7 +16,8 @@ class Config:
 	Atributes:
 		update_mode: whether to run in update mode or not. \n
 		table_name: the name of the table to load the data into.
-		dataset_name: the name of the dataset to load the data into.
+		dataset_name: the name of the dataset to load the data into. Default is
+			`{ENVIRONMENT}_published`.
 		lookbacktime: the number of days to look back when running in update mode.
 		min_date: the minimum date to look back to when *not* running in update mode.
 
@@ -35,17 +31,18 @@ class Config:
 	def __init__(self,
 							update_mode: bool = False,
 							table_name: str = '',
-							dataset_name: str = f'{ENVIRONMENT}_published',
+							dataset_name: Optional[str] = None,
 							lookbacktime: int = 5,
 							min_date: str = '2023-01-01T00:00:00Z'):
 		self.update_mode   = update_mode
 		self.table_name    = table_name
-		self.dataset_name  = dataset_name
+		self.dataset_name  = dataset_name if dataset_name is not None \
+			else f"{getenv('ENVIRONMENT')}_published"
 		self.lookbacktime  = lookbacktime
 		self.min_date      = min_date
 
 		# If we're running in the cloud, we're always in update mode
-		if LOCATION == 'cloud':
+		if getenv('LOCATION') == 'cloud':
 			self.update_mode = True
 			logging.info("Running in the cloud, setting update_mode to True")
 
@@ -55,40 +52,82 @@ class Config:
 				strftime('%Y-%m-%dT%H:%M:%SZ')
 			logging.info(f"Running in update mode, setting min_date to {self.min_date}")
 
+	#______________________________________________________________________________#
+	def check_destination(self) -> None:
+		"""
+		Check the table and dataset to load into have been set. These can be left
+		empty for pipelines that don't load anything, so this is only checked when
+		loading.
+		"""
+		if self.table_name == '':
+			raise ValueError("Table name cannot be empty.")
+		if self.dataset_name == '':
+			raise ValueError("Dataset name cannot be empty.")
+
 	#______________________________________________________________________________#
 	def __str__(self):
-		output = ''
-		for attr in self.__dict__:
-			if not attr.startswith('_'):
-				output += f"{attr}: {self.__dict__[attr]}\n"
-		return output
+		return ''.join(f"{attr}: {value}\n" for attr, value in self.__dict__.items()
+										if not attr.startswith('_'))
 #================================================================================#
 
 
-@dataclass(repr=True)
+#================================================================================#
+#_____ Data dataclass ___________________________________________________________#
+@dataclass
 class Data:
 	"""
-	Dataclass to hold the dataframes, e.g.:
-	>>> data = Data(df1=df1, df2=df2)
+	Dataclass to hold the dataframes, keyed by name, e.g.:
+	>>> data = Data(dataframes={'df1': df1, 'df2': df2})
 	"""
 
-	dataframes: dict
+	dataframes: Dict[str, DataFrame] = field(default_factory=dict)
+
+	#______________________________________________________________________________#
+	def to_string(self, max_rows: int = 0) -> str:
+		"""
+		Summarise the dataframes. The first `max_rows` rows of each dataframe are
+		included; by default only the names and shapes are shown.
+		"""
+		lines = ['Data object:']
+		for name, df in self.dataframes.items():
+			lines.append(f"--- {name}: [{df.__class__.__name__}] {getattr(df, 'shape', '')}")
+			if max_rows > 0 and isinstance(df, DataFrame):
+				lines.append(df.head(max_rows).to_string())
+		return '\n'.join(lines)
 
 	#______________________________________________________________________________#
-	def __init__(self, **kwargs):
-		for key, value in kwargs.items():
-			setattr(self, key, value)
+	def apply_numba(self, name: str, fn: Callable, col: str,
+									out_col: Optional[str] = None, dtype: Optional[DTypeLike] = None) -> None:
+		"""
+		Apply a function element-wise to a numeric column, using a compiled,
+		multi-core loop. The result is stored in a new column of the same dataframe.
+
+		### Parameters:
+		- name: the key of the dataframe in `dataframes`.
+		- fn: the function to apply. This must be compiled with `numba.njit`.
+		- col: the column to apply the function to.
+		- out_col: the column to store the result in. Default is `{col}_jit`.
+		- dtype: the dtype of the result. Default is the dtype of `col`.
+
+		Requires numba, which is an optional extra (`pip install etlkit[numba]`).
+
+		## Example:
+		>>> from numba import njit
+		>>> data.apply_numba('df_opps', njit(lambda x: x * 2.0), 'Amount')
+		"""
+		from numpy import empty
+		try:
+			from ._jit import apply_1d
+		except ImportError as e:
+			raise ImportError("apply_numba requires numba: pip install etlkit[numba]") from e
+
+		df  = self.dataframes[name]
+		arr = df[col].to_numpy()
+		out = empty(arr.shape[0], dtype=arr.dtype if dtype is None else dtype)
+		apply_1d(fn, arr, out)
+		df[out_col or f"{col}_jit"] = out
 
 	#______________________________________________________________________________#
 	def __str__(self):
-		output = 'Data object:'
-		for attr in self.__dict__:
-			if not attr.startswith('_'):
-				var = self.__dict__[attr]
-				if isinstance(var, DataFrame):
-					var = var.head(5)
-				output += f"""
---- {attr}: [{self.__dict__[attr].__class__.__name__}]
-{var}
-"""
-		return output
+		return self.to_string()
+#================================================================================#
@@ -1,10 +1,21 @@
 """Arrange credentials for the extractors / loaders"""
 
+import os
 import sys
 import json
+from pathlib import Path
+from functools import lru_cache
 from dataclasses import dataclass
+from typing import Any, Callable
 from . import logging
 
+# Use orjson for parsing if it's installed, otherwise the standard library
+json_loads: Callable[[bytes], Any]
+try:
+	from orjson import loads as json_loads
+except ImportError:
+	from json import loads as json_loads
+
 
 
 #================================================================================#
@@ -28,23 +39,57 @@ class SalesforceCreds:
 
 #================================================================================#
 # Helper functions
-def read_json(jsonfile: str) -> dict:
-	"""Read a JSON file"""
+@lru_cache(maxsize=32)
+def _read_json_cached(jsonfile: str, mtime: float) -> dict:
+	"""Read a JSON file. The mtime is only used as part of the cache key."""
 	try:
-		json_dict = json.load(open(jsonfile, 'r'))
+		json_dict = json_loads(Path(jsonfile).read_bytes())
 	except FileNotFoundError:
 		sys.exit(f"Credentials file {jsonfile} not found.")
-	except json.decoder.JSONDecodeError:
+	except json.JSONDecodeError: # orjson's decode error is a subclass of this
 		sys.exit(f"Credentials file {jsonfile} is not valid JSON.")
 	except Exception as e:
 		sys.exit(f"Unknown error reading credentials file {jsonfile}: {e}")
 	return json_dict
+
+#______________________________________________________________________________#
+def read_json(jsonfile: str) -> dict:
+	"""
+	Read a JSON file. Repeat reads of an unchanged file are served from a cache,
+	so the returned dict should not be modified.
+	"""
+	try:
+		mtime = os.path.getmtime(jsonfile)
+	except OSError:
+		sys.exit(f"Credentials file {jsonfile} not found.")
+	return _read_json_cached(jsonfile, mtime)
 #================================================================================#
 
 
 #================================================================================#
+@lru_cache(maxsize=4)
+def get_google_creds(jsonfile: str):
+	"""
+	Get the Google service account credentials from a service account key file.
+	Cached, so every Google client built from the same file shares one
+	credentials object.
+	"""
+	from google.oauth2.service_account import Credentials
+	return Credentials.from_service_account_info(read_json(jsonfile))
+
+#______________________________________________________________________________#
 def get_bq_creds(jsonfile: str = 'credentials.json') -> GoogleCreds:
 	"""Get BigQuery client"""
+	try:
+		mtime = os.path.getmtime(jsonfile)
+	except OSError:
+		sys.exit(f"Credentials file {jsonfile} not found.")
+	return _get_bq_creds_cached(jsonfile, mtime)
+
+#______________________________________________________________________________#
+@lru_cache(maxsize=8)
+def _get_bq_creds_cached(jsonfile: str, mtime: float) -> GoogleCreds:
+	"""Build the BigQuery credentials. The mtime is only used as part of the cache key."""
 	from google.oauth2.service_account import Credentials
 	creds_json = read_json(jsonfile)
 	if 'google_creds' not in creds_json:
@@ -1,41 +1,126 @@
 """
 Extractor classes for the ELT pipeline.
 """
-from sys import exit
+import re
+import asyncio
+from numbers import Real
 import time
-from pandas import DataFrame
-from typing import Callable, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pandas import DataFrame, ArrowDtype, concat
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass
-from dotenv import load_dotenv
 from ._baseclasses import BaseExtract
+from ._dtype_opt import optimize_dataframe
 from .containers import Data
 from . import logging
 
-load_dotenv()
+
+# Matches the object / table name in the FROM clause of a query (including
+# dotted and `backticked` BigQuery table names)
+_FROM_RE = re.compile(r'\bFROM\s+`?([\w.\-]+)', re.IGNORECASE)
+# Number of records per chunk when streaming simple Salesforce queries
+SIMPLE_QUERY_CHUNK_ROWS = 50_000
+# Seconds between progress messages while waiting for a Salesforce bulk batch
+BULK_PROGRESS_LOG_INTERVAL = 15
+# Seconds before a new extractor logs in to Salesforce again, rather than reusing
+# the cached session (sessions time out after 2 hours by default)
+SF_SESSION_TTL = 3600
+
+
+#================================================================================#
+class QueryError(RuntimeError):
+	"""Raised when an extractor's query fails (e.g. a malformed query)."""
+#================================================================================#
+
+
+#================================================================================#
+def _read_csv_as_strings(raw: bytes) -> pa.Table:
+	"""
+	Parse CSV bytes into an Arrow table, reading every column as a string.
+	Quoted values may contain newlines (e.g. Description / address fields).
+	"""
+	# Slice out just the header line, rather than splitting (and copying) the payload
+	header_end = raw.find(b'\n')
+	header_line = raw if header_end == -1 else raw[:header_end]
+	header = next(csv.reader([header_line.decode('utf-8').rstrip('\r')]))
+	convert_options = pacsv.ConvertOptions(column_types={col: pa.string() for col in header})
+	parse_options = pacsv.ParseOptions(newlines_in_values=True)
+	return pacsv.read_csv(pa.BufferReader(raw), parse_options=parse_options,
+												convert_options=convert_options)
+#================================================================================#
+
+
+#______________________________________________________________________________#
+def _sql_literal(value) -> str:
+	"""
+	Format a partition bound as a SQL literal: numbers are left bare (so they can be
+	compared with INT64 / FLOAT64 columns), anything else is quoted as a string.
+	"""
+	if isinstance(value, Real) and not isinstance(value, bool):
+		return str(value)
+	return "'" + str(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+#______________________________________________________________________________#
+@lru_cache(maxsize=4)
+def _get_sf_client(bulk: bool, username: str, password: str, security_token: str,
+									ttl_bucket: int = 0):
+	"""
+	Get a logged-in Salesforce client (bulk or simple). These are cached, so each
+	set of credentials only logs in once per `ttl_bucket` (see `SF_SESSION_TTL`).
+	"""
+	if bulk:
+		from salesforce_bulk import SalesforceBulk
+		return SalesforceBulk(username=username, password=password,
+													security_token=security_token)
+	from simple_salesforce import Salesforce
+	return Salesforce(username=username, password=password, security_token=security_token)
+
+#______________________________________________________________________________#
+@lru_cache(maxsize=4)
+def _get_bq_client(creds_json: str):
+	"""
+	Get an authenticated BigQuery client. These are cached, so each credentials
+	file is only authenticated once per process.
+	"""
+	from google.cloud.bigquery import Client as BigQueryClient
+	from .credentials import get_google_creds
+	return BigQueryClient(credentials=get_google_creds(creds_json))
+
+#______________________________________________________________________________#
+@lru_cache(maxsize=4)
+def _get_bqstorage_client(creds_json: str):
+	"""
+	Get a BigQuery Storage Read API client, for downloading query results as
+	Arrow record batches. Cached alongside the query client.
+	"""
+	from google.cloud.bigquery_storage import BigQueryReadClient
+	from .credentials import get_google_creds
+	return BigQueryReadClient(credentials=get_google_creds(creds_json))
+#================================================================================#
 
 
 #================================================================================#
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractorJob:
 	"""
-	Container class for an extract job.
+	Container class for an extract job. The type checks are skipped under `python -O`.
 	"""
-	query: str
-	name: str
 	extractor: BaseExtract
+	name: str
+	query: str
 
-	def __init__(self, extractor: BaseExtract, name: str, query: str) -> None:
-		self.query = query
-		self.name = name
-		self.extractor = extractor
-
-		tests = [
-			isinstance(query, str),
-			isinstance(name, str),
-			isinstance(extractor, BaseExtract)
-		]
-		if not all(tests):
-			raise TypeError("ExtractorJob requires a query string, a name, and an extractor object.")
+	def __post_init__(self) -> None:
+		if __debug__:
+			if not isinstance(self.query, str):
+				raise TypeError(f"ExtractorJob: query must be a string, got {type(self.query)}")
+			if not isinstance(self.name, str):
+				raise TypeError(f"ExtractorJob: name must be a string, got {type(self.name)}")
+			if not isinstance(self.extractor, BaseExtract):
+				raise TypeError(f"ExtractorJob: extractor must be a BaseExtract, got {type(self.extractor)}")
 #================================================================================#
 
 
@@ -44,14 +129,25 @@ class SalesforceExtractor(BaseExtract):
 
 	"""
 	Class containing the extractor methods for simple / bulk Salesforce queries.
+
+	### Parameters:
+	- bulk: if True, use the Bulk API rather than the REST API.
+	- creds_json: the path to the Salesforce credentials JSON file.
+	- max_poll_interval: the longest wait (in seconds) between checks on whether
+		a bulk batch has finished. Default is 10.
+	- downcast: if True, shrink the dtypes of the returned dataframes (see
+		`optimize_dataframe`). Default is False.
 	"""
 
 	#client: Salesforce | SalesforceBulk
 	query_runner: Callable[[str], DataFrame]
 
 	#______________________________________________________________________________#
-	def __init__(self, bulk: bool = False, creds_json: str = ''):
+	def __init__(self, bulk: bool = False, creds_json: str = '',
+							max_poll_interval: float = 10.0, downcast: bool = False):
 		from .credentials import get_salesforce_creds
+		self.max_poll_interval = max_poll_interval
+		self.downcast = downcast
 
 		# Get the credentials
 		if creds_json == '':
@@ -60,21 +156,23 @@ class SalesforceExtractor(BaseExtract):
 			self.query_runner = self._simple_query
 			return None
 			#raise ValueError("No Salesforce credentials JSON file provided.")
-		creds = get_salesforce_creds(creds_json)
-
-		# Create the client
-		if bulk:
-			from salesforce_bulk import SalesforceBulk
-			self.client = SalesforceBulk(username=creds.username,
-																		password=creds.password,
-																		security_token=creds.security_token)
-			self.query_runner = self._bulk_query
-		else:
-			from simple_salesforce import Salesforce
-			self.client = Salesforce(username=creds.username,
-																		password=creds.password,
-																		security_token=creds.security_token)
-			self.query_runner = self._simple_query
+		self._bulk = bulk
+		self._creds = get_salesforce_creds(creds_json)
+
+		# Get the (cached) client
+		self._login()
+		self.query_runner = self._bulk_query if bulk else self._simple_query
+
+
+	#______________________________________________________________________________#
+	def _login(self) -> None:
+		"""
+		Set `self.client` to the cached client for these credentials, logging in
+		again in each new `SF_SESSION_TTL` window.
+		"""
+		creds = self._creds
+		self.client = _get_sf_client(self._bulk, creds.username, creds.password,
+																creds.security_token, int(time.monotonic() // SF_SESSION_TTL))
 
 
 	#______________________________________________________________________________#
@@ -82,51 +180,98 @@ class SalesforceExtractor(BaseExtract):
 		"""
 		Simple query using simple_salesforce.
 		"""
-		from simple_salesforce.exceptions import SalesforceMalformedRequest
+		# Imported here so that BigQuery-only users never load simple_salesforce
+		from simple_salesforce.exceptions import (SalesforceExpiredSession,
+																							SalesforceMalformedRequest)
+
 		try:
-			data = self.client.query_all(query) # type: ignore
-		except SalesforceMalformedRequest:
+			try:
+				frames = self._stream_records(query)
+			except SalesforceExpiredSession:
+				# The cached session has timed out: drop it, log in again and retry once
+				logging.info("Salesforce session expired, logging in again...")
+				_get_sf_client.cache_clear()
+				self._login()
+				frames = self._stream_records(query)
+		except SalesforceMalformedRequest as e:
 			logging.error("Malformed query.")
-			print('Query: ', query)
-			exit()
+			raise QueryError(f"Malformed query: {query}") from e
 
-		df = DataFrame(data['records'])
-		df.drop(columns=['attributes'], inplace=True)
+		if not frames:
+			return DataFrame()
+		df = concat(frames, ignore_index=True, copy=False)
+		if self.downcast:
+			df = optimize_dataframe(df)
 		return df
 
 
+	#______________________________________________________________________________#
+	def _stream_records(self, query: str) -> List[DataFrame]:
+		"""
+		Stream the records in chunks (skipping the 'attributes' metadata), so the
+		full list of record dicts is never held in memory. Each chunk is built
+		with from_records and an explicit column list, taken from the first record.
+		"""
+		frames: List[DataFrame] = []
+		chunk: List[dict] = []
+		columns: Optional[List[str]] = None
+		for record in self.client.query_all_iter(query): # type: ignore
+			record.pop('attributes', None)
+			if columns is None:
+				columns = list(record)
+			chunk.append(record)
+			if len(chunk) == SIMPLE_QUERY_CHUNK_ROWS:
+				frames.append(DataFrame.from_records(chunk, columns=columns))
+				chunk = []
+		if chunk:
+			frames.append(DataFrame.from_records(chunk, columns=columns))
+		return frames
+
+
 	#______________________________________________________________________________#
 	def _bulk_query(self, query: str = '') -> DataFrame:
 		"""
 		Bulk query using salesforce_bulk.
 		"""
-		import unicodecsv
-
 		sfbulk = self.client
 
 		# Extract the object from the query
-		obj = query.split('FROM ')[1].split('\n')[0]
+		match = _FROM_RE.search(query)
+		if match is None:
+			raise ValueError(f"Could not find a FROM clause in the query: {query}")
+		obj = match.group(1)
 
 		job = sfbulk.create_query_job(obj, contentType='CSV') # type: ignore
 		batch = sfbulk.query(job, query) # type: ignore
 		sfbulk.close_job(job) # type: ignore
 
-		# Wait for the batch to complete
+		# Wait for the batch to complete, backing off exponentially between polls
 		logging.info("Waiting for batch to finish...")
+		delay = 0.05
+		start = time.monotonic()
+		last_log = 0.0
 		while not sfbulk.is_batch_done(batch): # type: ignore
-			# Keep going until it's done, while displaying '.' every 5 seconds
-			time.sleep(1)
-			print('.', end='',flush=True)
-		print()
-
-		# Get the results
-		data = []
+			time.sleep(delay)
+			delay = min(delay*1.5, self.max_poll_interval)
+			elapsed = time.monotonic() - start
+			if elapsed - last_log >= BULK_PROGRESS_LOG_INTERVAL:
+				logging.info("SF bulk batch running, elapsed=%.0fs", elapsed)
+				last_log = elapsed
+
+		# Get the results. Each result is a CSV byte stream, which we hand straight
+		# to Arrow's (multi-threaded, columnar) CSV parser. Every column is kept as
+		# a string, with empty fields as '' rather than nulls.
+		tables = []
 		logging.info("Batch finished. Getting results...")
 		for result in sfbulk.get_all_results_for_query_batch(batch): # type: ignore
-			reader = unicodecsv.DictReader(result, encoding='utf-8')
-			for row in reader:
-				data.append(row)
-		df = DataFrame(data)
+			raw = result.read() if hasattr(result, 'read') else b''.join(result)
+			if raw:
+				tables.append(_read_csv_as_strings(raw))
+		if not tables:
+			return DataFrame()
+		df = pa.concat_tables(tables).to_pandas(split_blocks=True, self_destruct=True)
+		if self.downcast:
+			df = optimize_dataframe(df)
 		return df
 #================================================================================#
 
@@ -142,39 +287,93 @@ class BigQueryExtractor(BaseExtract):
 
 	### Parameters:
 	- creds_json: the path to the Google Credentials JSON file for BigQuery.
+	- downcast: if True, shrink the dtypes of the returned dataframes (see
+		`optimize_dataframe`). Default is False.
+	- partition_on: optionally, a column to split the query on. Each range in
+		`partitions` is then queried in parallel, and the results concatenated.
+	- partitions: a list of (start, end) tuples giving the (inclusive) ranges of
+		`partition_on` to query, e.g. `[('2023-01-01', '2023-06-30'), ...]`.
+	- arrow_dtypes: if True, keep the results as Arrow-backed columns
+		(`pd.ArrowDtype`) rather than converting them to numpy dtypes. Default is False.
+	- max_workers: the most partitions to query at once. Default is
+		`MAX_PARTITION_WORKERS`.
 	"""
-	from google.cloud.bigquery import Client as BigQueryClient
+
+	# Default cap on the number of partition queries run at once
+	MAX_PARTITION_WORKERS = 8
 
 	#______________________________________________________________________________#
-	def __init__(self, creds_json: str = ''):
-		from google.oauth2.service_account import Credentials
+	def __init__(self, creds_json: str = '', downcast: bool = False,
+							partition_on: Optional[str] = None,
+							partitions: Optional[List[tuple]] = None,
+							arrow_dtypes: bool = False,
+							max_workers: Optional[int] = None):
+		self.downcast     = downcast
+		self.arrow_dtypes = arrow_dtypes
+		self.partition_on = partition_on
+		self.partitions   = partitions or []
+		self.max_workers  = max_workers or self.MAX_PARTITION_WORKERS
+		if partition_on and not self.partitions:
+			raise ValueError("BigQueryExtractor: `partitions` must be given with `partition_on`.")
+		self.query_runner = self._query_partitioned if partition_on else self._query
+
 		if creds_json == '':
 			logging.error("BigQueryExtractor: No Google credentials JSON file provided.")
 			logging.error("BigQueryExtractor: set `google_creds_json = `[path to JSON file]")
-			self.query_runner = self._query
 			return None
 			#raise ValueError("No Google credentials JSON file provided.")
-		creds = Credentials.from_service_account_file(creds_json)
-		self.client = self.BigQueryClient(credentials=creds)
-		self.query_runner = self._query
+		self.client = _get_bq_client(creds_json)
+		self.bqstorage_client = _get_bqstorage_client(creds_json)
 
 	#______________________________________________________________________________#
 	def _query(self, query: str = '') -> DataFrame:
 		"""
 		Query BigQuery.
 		"""
+		df = self._fetch(query)
+		if self.downcast:
+			df = optimize_dataframe(df)
+		return df
 
-		buffer = query.split(self.client.project+'.')
-		if len(buffer) > 1:
-			table = buffer[1].split(' ')[0]
-			logging.info(f"Querying BigQuery table {table}")
+	#______________________________________________________________________________#
+	def _query_partitioned(self, query: str = '') -> DataFrame:
+		"""
+		Query BigQuery, one partition of `partition_on` at a time. The partitions
+		are run in parallel threads (at most `max_workers` at once), and the
+		results concatenated.
+		"""
+		col = self.partition_on
+		queries = [f"SELECT * FROM ({query}) WHERE {col} "
+								f"BETWEEN {_sql_literal(start)} AND {_sql_literal(end)}"
+								for start, end in self.partitions]
+
+		with ThreadPoolExecutor(max_workers=min(len(queries), self.max_workers)) as executor:
+			frames = list(executor.map(self._fetch, queries))
+
+		df = concat(frames, ignore_index=True, copy=False)
+		if self.downcast:
+			df = optimize_dataframe(df)
+		return df
+
+	#______________________________________________________________________________#
+	def _fetch(self, query: str) -> DataFrame:
+		"""
+		Run a query and download the results.
+		"""
+		match = _FROM_RE.search(query)
+		if match is not None:
+			logging.info("Querying BigQuery table %s", match.group(1))
 
 		try:
-			df = self.client.query(query).to_dataframe()
+			# Download via the Storage Read API as Arrow, then convert column-wise
+			arrow_table = self.client.query(query).to_arrow(bqstorage_client=self.bqstorage_client)
+			if self.arrow_dtypes:
+				df = arrow_table.to_pandas(types_mapper=ArrowDtype, self_destruct=True)
+			else:
+				df = arrow_table.to_pandas(split_blocks=True, self_destruct=True)
 		except Exception as e:
-			logging.error("Error querying BQ:", e.__class__.__name__)
-			print('\n\nQuery:\n', query)
-			raise e
+			logging.error("Error querying BQ: %s", e.__class__.__name__)
+			raise QueryError(f"BigQuery query failed: {query}") from e
 		return df
 #================================================================================#
 
@@ -196,6 +395,8 @@ class MultiExtractor:
 	### Methods:
 	* create_job: creates an ExtractorJob object and adds it to the
 		`extractor_jobs` list.
+	* close: shuts down the thread pool that runs the jobs. This is called
+		automatically if the extractor is used as a context manager.
 
 	## Example usage:
 	>>> # First, create an instance of the class
@@ -219,9 +420,14 @@ class MultiExtractor:
 	extractor_jobs: List[ExtractorJob]
 	run: Callable[[], Data]
 
+	# Most jobs run at once. Threads are only started as jobs need them, so this is
+	# a cap rather than a cost
+	MAX_WORKERS = 16
+
 	#______________________________________________________________________________#
 	def __init__(self, async_extract: bool = False):
 		self.extractor_jobs: List[ExtractorJob] = []
+		self._executor: Optional[ThreadPoolExecutor] = None
 		if async_extract:
 			self.run = self._run_async
 		else:
@@ -261,53 +467,88 @@ class MultiExtractor:
 		self.extractor_jobs.append(job)
 
 
+	#______________________________________________________________________________#
+	def _get_executor(self) -> ThreadPoolExecutor:
+		"""
+		Get the thread pool used to run the jobs. It is created on first use, with
+		`MAX_WORKERS` threads, so jobs added after a run still run in parallel.
+		"""
+		if self._executor is None:
+			self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+																					thread_name_prefix='etlkit')
+		return self._executor
+
+	#______________________________________________________________________________#
+	def close(self) -> None:
+		"""
+		Shut down the thread pool, waiting for any running jobs to finish.
+		"""
+		if self._executor is not None:
+			self._executor.shutdown(wait=True)
+			self._executor = None
+
+	def __enter__(self) -> 'MultiExtractor':
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
 	#______________________________________________________________________________#
 	def _run(self) -> Data:
 		"""
-		Run the extractor jobs.
+		Run the extractor jobs, in parallel threads.
 		### Returns:
 		- data: a `Data` object containing the attribute `dataframes`, which is a `dict`
 		containing the extracted dataframes.
 		"""
-		data = Data(dataframes={})
-		for job in self.extractor_jobs:
-			extractor = job.extractor
-			name      = job.name
-			query     = job.query
-			df = extractor.query_runner(query)
-			data.dataframes['df_'+name] = df
-			logging.info(f"Extracted data from {name}")
+		# The queries are I/O-bound, so run them in threads to overlap the waits
+		results: Dict[str, DataFrame] = {}
+		executor = self._get_executor()
+		futures = {executor.submit(job.extractor.query_runner, job.query): job
+								for job in self.extractor_jobs}
+		try:
+			for future in as_completed(futures):
+				name = futures[future].name
+				results[name] = future.result()
+				logging.info("Extracted data from %s", name)
+		except Exception:
+			# Don't start any jobs that are still queued
+			for future in futures:
+				future.cancel()
+			raise
+
+		# Key the output in job order, regardless of which job finished first
+		data = Data(dataframes={'df_'+job.name: results[job.name] for job in self.extractor_jobs})
 		return data
 
 	#______________________________________________________________________________#
 	async def _extract_async(self) -> Data:
 		"""
-		Async function to run the jobs asynchronously.
+		Async function to run the jobs asynchronously. The (blocking) query runners
+		are each sent to the extractor's thread pool, so that they actually run
+		concurrently.
 		"""
-		from asyncio import create_task as asyncio_create_task
-
-		# Convert a function to an async function
-		async def _asyncify(func: Callable, *args, **kwargs):
-			return func(*args, **kwargs)
+		# Send each job to the thread pool
+		loop = asyncio.get_running_loop()
+		executor = self._get_executor()
+		tasks = [loop.run_in_executor(executor, job.extractor.query_runner, job.query)
+							for job in self.extractor_jobs]
+
+		# Collect the results, in job order. If a query fails, cancel the jobs that
+		# haven't started yet before passing the error on
+		try:
+			results = await asyncio.gather(*tasks)
+		except Exception:
+			for task in tasks:
+				task.cancel()
+			raise
 
-		# Build a list of async tasks
 		data = Data(dataframes={})
-		tasks = []
-		for job in self.extractor_jobs:
-			extractor = job.extractor
-			name      = job.name
-			query     = job.query
-			task = asyncio_create_task(_asyncify(extractor.query_runner, query))
-			tasks.append(task)
-
-		# Build the job list
-		for task, name in zip(tasks, [job.name for job in self.extractor_jobs]):
-			df = await task
-			data.dataframes['df_'+name] = df
-			logging.info(f"Extracted data from {name}")
+		for job, df in zip(self.extractor_jobs, results):
+			data.dataframes['df_'+job.name] = df
+			logging.info("Extracted data from %s", job.name)
 		return data
 
 	def _run_async(self) -> Data:
-		from asyncio import run as asyncio_run
-		return asyncio_run(self._extract_async())
+		return asyncio.run(self._extract_async())
 #================================================================================#
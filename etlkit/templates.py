@@ -1,16 +1,9 @@
 import sys
-import dotenv
-import os
 from typing import Any, List, Protocol, Type, Optional
-from pandas import DataFrame
-from . import logging
+from pandas import DataFrame, Index, Series
+from . import logging, getenv
 from .containers import Data, Config
 
-#_____ GLOBALS _____#
-dotenv.load_dotenv()
-ENVIRONMENT = os.getenv('ENVIRONMENT')
-LOCATION    = os.getenv('LOCATION')
-
 
 #================================================================================#
 # Helper functions ______________________________________________________________#
@@ -33,13 +26,12 @@ def generic_check_handler(tests: List[tuple[bool,str,Type[Exception]]] ) -> None
 	Checks a list of generic conditions, and throws an exception if any of the
 	conditions are not met.
 	"""
-	exceptions = []
-	for test in tests:
-		exceptions.append(generic_checker(*test))
+	# Run every check (so each failure gets logged), keeping only the failures
+	exceptions = [e for e in (generic_checker(*test) for test in tests) if e is not None]
 
 	# Did any errors get thrown?
-	if any([x is not None for x in exceptions]):
-		if LOCATION == 'local':
+	if exceptions:
+		if getenv('LOCATION') == 'local':
 			logging.error("Errors were thrown, entering debug mode.")
 			raise Exception(exceptions)
 		else:
@@ -47,6 +39,16 @@ def generic_check_handler(tests: List[tuple[bool,str,Type[Exception]]] ) -> None
 			raise Exception(exceptions)
 
 
+#________________________________________________________________________________#
+def _unique_id_ok(ids: Series) -> bool:
+	"""
+	Check that a column has no duplicates. Builds the hashtable on a plain Index
+	over the values, and skips the check for fewer than two rows.
+	"""
+	if len(ids) < 2:
+		return True
+	return Index(ids.to_numpy()).is_unique
+
 #________________________________________________________________________________#
 def load_checker(df: DataFrame, config: Config) -> None:
 	# Check the table name is not empty
@@ -55,7 +57,7 @@ def load_checker(df: DataFrame, config: Config) -> None:
 		(config.dataset_name != '', "Dataset name cannot be empty.", ValueError),
 		(isinstance(df, DataFrame), f"Expected a dataframe, got {type(df)}", TypeError),
 		('Unique_ID' in df.columns, "No 'Unique_ID' col in the output.", KeyError),
-		(df['Unique_ID'].is_unique, "The 'Unique_ID' col is not unique.", ValueError),
+		(_unique_id_ok(df['Unique_ID']), "The 'Unique_ID' col is not unique.", ValueError),
 	]
 
 	generic_check_handler(tests)
@@ -71,7 +73,7 @@ def transform_checker(output: DataFrame) -> None:
 	tests = [
 		(isinstance(output, DataFrame), f"Expected a dataframe, got {type(output)}", TypeError),
 		('Unique_ID' in output.columns, "No 'Unique_ID' col in the output.", KeyError),
-		(output['Unique_ID'].is_unique, "The 'Unique_ID' col is not unique.", ValueError),
+		(_unique_id_ok(output['Unique_ID']), "The 'Unique_ID' col is not unique.", ValueError),
 	]
 
 	generic_check_handler(tests)
@@ -170,11 +172,11 @@ class TransformTemplate(Protocol):
 			errors.append(TypeError(f"Expected a dict, got {type(dataframes)}"))
 			self.throw_errors(errors)
 
-		for key, value in dataframes.items():
-			if not isinstance(value, DataFrame):
-				errors.append(TypeError(f"Expected a DataFrame, got {type(value)}"))
-			if value.empty:
-				errors.append(ValueError(f"Dataframe {key} is empty."))
+		errors += [TypeError(f"Expected a DataFrame, got {type(value)}")
+								for value in dataframes.values() if not isinstance(value, DataFrame)]
+		errors += [ValueError(f"Dataframe {key} is empty.")
+								for key, value in dataframes.items()
+								if isinstance(value, DataFrame) and len(value.index) == 0]
 
 		# If there are errors, throw them
 		self.throw_errors(errors)
@@ -10,6 +10,10 @@ setup(
 	author = 'Ben Davies',
 	packages = find_packages(),
 	install_requires = requirements,
+	# Only needed for Data.apply_numba: pip install etlkit[numba]
+	extras_require = {
+		'numba': ['numba==0.58.1', 'llvmlite==0.41.1'],
+	},
 	classifiers = [
 		'Programming Language :: Python :: 3',
 		'License :: OSI Approved :: MIT License',
@@ -0,0 +1,68 @@
+"""
+Mock clients / credentials shared by the tests. Each factory imports and
+introspects its SDK class on first use only, then returns the same mock.
+"""
+from functools import lru_cache
+from unittest.mock import Mock, create_autospec
+import pandas as pd
+
+#_____ GLOBALS _____#
+# Shared empty frame for the mocks to return. The tests only read from it
+# (`.empty`, `.columns`), so one instance is safe to share.
+EMPTY_DF = pd.DataFrame()
+
+
+#================================================================================#
+@lru_cache(None)
+def sf_client() -> Mock:
+	"""Stand-in for the `simple_salesforce.Salesforce` class."""
+	from simple_salesforce import Salesforce
+	mock = create_autospec(Salesforce)
+	mock.query_all = Mock(return_value=EMPTY_DF)
+	return mock
+
+#______________________________________________________________________________#
+@lru_cache(None)
+def sf_bulk_client() -> Mock:
+	"""Stand-in for the `salesforce_bulk.SalesforceBulk` class."""
+	from salesforce_bulk import SalesforceBulk
+	mock = create_autospec(SalesforceBulk)
+	mock.query = Mock(return_value=EMPTY_DF)
+	mock.is_batch_done = Mock(return_value=True)
+	mock.get_all_results_for_query_batch = Mock(return_value={})
+	return mock
+
+#______________________________________________________________________________#
+@lru_cache(None)
+def bq_client() -> Mock:
+	"""Stand-in for the `google.cloud.bigquery.Client` class."""
+	from google.cloud.bigquery import Client as BQClient
+	return create_autospec(BQClient)
+
+#______________________________________________________________________________#
+@lru_cache(None)
+def google_creds() -> Mock:
+	"""Stand-in for the `google.oauth2.service_account.Credentials` class."""
+	from google.oauth2.service_account import Credentials as GoogleCreds
+	mock = create_autospec(GoogleCreds)
+	mock.from_service_account_info = Mock(return_value=None)
+	mock.from_service_account_file = Mock(return_value=None)
+	return mock
+
+#______________________________________________________________________________#
+@lru_cache(None)
+def service_account() -> Mock:
+	"""Stand-in for the `google.oauth2.service_account` module."""
+	mock = Mock()
+	mock.Credentials = google_creds()
+	return mock
+#================================================================================#
+
+
+#================================================================================#
+@lru_cache(None)
+def mock_get_salesforce_creds(*args, **kwargs):
+	"""Stand-in for `credentials.get_salesforce_creds`."""
+	from ..etlkit.credentials import SalesforceCreds
+	return SalesforceCreds('username','password','security_token')
+#================================================================================#
@@ -74,16 +74,14 @@ class TestBaseClasses:
 
 	def test_BaseExtract(self):
 		extractor = DummyExtractor()
-		assert hasattr(extractor, 'query')
-		assert hasattr(extractor, 'query_runner')
+		assert {'query', 'query_runner'} <= set(dir(extractor))
 		assert isinstance(extractor.query, str)
 		assert isinstance(extractor.query_runner(), pd.DataFrame)
 
 
 	def test_BaseLoad(self):
 		loader = DummyLoader()
-		assert hasattr(loader, 'load')
-		assert hasattr(loader, '__call__')
+		assert {'load', '__call__'} <= set(dir(loader))
 		assert loader.load(pd.DataFrame()) is None
 #==============================================================================#
 
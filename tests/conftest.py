@@ -0,0 +1,39 @@
+import importlib
+from contextlib import ExitStack
+from unittest.mock import patch
+import pytest
+from ._mock_fixtures import sf_client, sf_bulk_client, mock_get_salesforce_creds
+
+
+#================================================================================#
+def _patch_salesforce() -> ExitStack:
+	"""Patch the Salesforce clients and credentials, all under one ExitStack."""
+	stack = ExitStack()
+	for target, new in [('simple_salesforce.Salesforce', sf_client()),
+											('salesforce_bulk.SalesforceBulk', sf_bulk_client()),
+											('etlkit.etlkit.credentials.get_salesforce_creds', mock_get_salesforce_creds)]:
+		stack.enter_context(patch(target, new=new))
+	return stack
+#================================================================================#
+
+
+#================================================================================#
+@pytest.fixture(scope='session')
+def extractors_module():
+	"""The extractors module, imported once per test session."""
+	return importlib.import_module('..etlkit.extractors', package=__package__)
+
+#______________________________________________________________________________#
+@pytest.fixture(scope='session')
+def sf_simp(extractors_module):
+	"""A simple-API SalesforceExtractor on the mock client, shared by the session."""
+	with _patch_salesforce():
+		return extractors_module.SalesforceExtractor(bulk=False, creds_json='test.json')
+
+#______________________________________________________________________________#
+@pytest.fixture(scope='session')
+def sf_bulk(extractors_module):
+	"""A bulk-API SalesforceExtractor on the mock client, shared by the session."""
+	with _patch_salesforce():
+		return extractors_module.SalesforceExtractor(bulk=True, creds_json='test.json')
+#================================================================================#
@@ -1,3 +1,4 @@
+import pytest
 from ..etlkit.containers import Data, Config
 from pandas import Timedelta, Timestamp, DataFrame
 
@@ -8,7 +9,22 @@ def test_Config():
 				strftime('%Y-%m-%dT%H:%M:%SZ')
 
 
+def test_Config_check_destination():
+	Config(table_name='table', dataset_name='dataset').check_destination()
+	with pytest.raises(ValueError):
+		Config(dataset_name='dataset').check_destination()
+	with pytest.raises(ValueError):
+		Config(table_name='table', dataset_name='').check_destination()
+
+
 def test_Data():
 	data = Data(dataframes={'my_table':DataFrame()})
 	assert hasattr(data,'dataframes')
 	assert isinstance(data.dataframes,dict)
+
+
+def test_Data_apply_numba():
+	numba = pytest.importorskip('numba')
+	data = Data(dataframes={'my_table':DataFrame({'x': [1.0, 2.0, 3.0]})})
+	data.apply_numba('my_table', numba.njit(lambda x: x * 2.0), 'x')
+	assert data.dataframes['my_table']['x_jit'].tolist() == [2.0, 4.0, 6.0]
@@ -0,0 +1,26 @@
+import numpy as np
+from pandas import DataFrame
+from ..etlkit._dtype_opt import optimize_dataframe
+
+
+def test_optimize_dataframe():
+	df = DataFrame({
+		'small_int': [1, 2, 3, 4, 5],
+		'big_int':   [0, 1, 2, 2, 2**40],
+		'float':     [0.5, 1.5, 2.5, 3.5, 4.5],
+		'category':  ['a', 'a', 'a', 'a', 'b'],
+		'unique':    ['v', 'w', 'x', 'y', 'z'],
+	})
+	out = optimize_dataframe(df)
+
+	assert out['small_int'].dtype == np.int8
+	assert out['big_int'].dtype == np.int64
+	assert out['float'].dtype == np.float32
+	assert out['category'].dtype == 'category'
+	assert out['unique'].dtype == object
+	assert df['small_int'].dtype == np.int64 # input untouched
+
+
+def test_optimize_empty_dataframe():
+	df = DataFrame({'a': []})
+	assert optimize_dataframe(df).empty
@@ -1,80 +1,143 @@
 import pytest
 from typing import List
-from unittest.mock import Mock, patch
-import pandas as pd
+from unittest.mock import AsyncMock, Mock, patch
 from ..etlkit.containers import Data
+from ._mock_fixtures import EMPTY_DF
 
 
 def clear_cache(search_strings: List[str]):
+	"""Remove every imported module whose name contains one of the search strings."""
 	import sys
-	for search_string in search_strings:
-		for key in list(sys.modules.keys()):
-			if search_string in key:
-				del sys.modules[key]
+	for key in [key for key in sys.modules if any(s in key for s in search_strings)]:
+		del sys.modules[key]
 
 
 #================================================================================#
-class MockObjects:
-	from salesforce_bulk import SalesforceBulk
-	mock_sf_bulk_client = Mock(SalesforceBulk)
-	mock_sf_bulk_client.query = Mock(return_value=pd.DataFrame())
-	mock_sf_bulk_client.is_batch_done = Mock(return_value=True)
-	mock_sf_bulk_client.get_all_results_for_query_batch = Mock(return_value={})
-
-	from simple_salesforce import Salesforce
-	mock_sf_client = Mock(Salesforce)
-	mock_sf_client.query_all = Mock(return_value=pd.DataFrame())
-
-	from google.cloud.bigquery import Client as BQClient
-	mock_bq_client = Mock(BQClient)
-
-	from google.oauth2.service_account import Credentials as GoogleCreds
-	mock_google_creds = Mock(GoogleCreds)
-	mock_google_creds.from_service_account_info = Mock(return_value=None)
-	mock_google_creds.from_service_account_file = Mock(return_value=None)
-
-	mock_service_account = Mock()
-	mock_service_account.Credentials = Mock(GoogleCreds)
-	mock_service_account.Credentials.from_service_account_info = Mock(return_value=None)
-	mock_service_account.Credentials.from_service_account_file = Mock(return_value=None)
-
-	#_ = clear_cache(['oogle','alesforce'])
-	#del SalesforceBulk, Salesforce, BQClient, GoogleCreds
+def test_extractors_import_is_lazy(extractors_module):
+	# Import the module in a fresh interpreter, and check no SDK got loaded
+	import subprocess
+	import sys
+	from pathlib import Path
+	root = Path(extractors_module.__file__).resolve().parents[1] # the repo's package dir
+	code = (f"import importlib, sys; importlib.import_module({extractors_module.__name__!r}); "
+					"print(sorted(set(sys.modules) & {'simple_salesforce', 'salesforce_bulk', "
+					"'google.cloud.bigquery', 'google.oauth2'}))")
+	result = subprocess.run([sys.executable, '-c', code], cwd=root.parent,
+													capture_output=True, text=True, check=True)
+	assert result.stdout.strip() == '[]'
+#================================================================================#
+
+
 #================================================================================#
+@pytest.mark.parametrize('partitions, bounds', [
+	([(0, 9), (10, 19)], ["BETWEEN 0 AND 9", "BETWEEN 10 AND 19"]),
+	([('2023-01-01', '2023-06-30'), ('2023-07-01', '2023-12-31')],
+		["BETWEEN '2023-01-01' AND '2023-06-30'", "BETWEEN '2023-07-01' AND '2023-12-31'"]),
+])
+def test_bq_query_partitioned(extractors_module, partitions, bounds):
+	from pandas import DataFrame
+	bq = extractors_module.BigQueryExtractor(partition_on='n', partitions=partitions)
+	assert bq.query_runner.__func__ is extractors_module.BigQueryExtractor._query_partitioned
+
+	with patch.object(bq, '_fetch', side_effect=lambda query: DataFrame({'query': [query]})):
+		df = bq.query_runner('SELECT * FROM t')
+
+	# One query per partition, with the results concatenated in partition order
+	assert df['query'].tolist() == [f"SELECT * FROM (SELECT * FROM t) WHERE n {b}" for b in bounds]
+	assert df.index.tolist() == [0, 1]
 
 #______________________________________________________________________________#
-def mock_get_salesforce_creds(*args, **kwargs):
-	from ..etlkit.credentials import SalesforceCreds
-	return SalesforceCreds('username','password','security_token')
+def test_bq_query_partitioned_caps_workers(extractors_module):
+	from pandas import DataFrame
+	from concurrent.futures import ThreadPoolExecutor
+	partitions = [(i, i) for i in range(5)]
+	bq = extractors_module.BigQueryExtractor(partition_on='n', partitions=partitions, max_workers=2)
+
+	with patch.object(bq, '_fetch', return_value=DataFrame({'n': [0]})), \
+			patch.object(extractors_module, 'ThreadPoolExecutor', wraps=ThreadPoolExecutor) as pool:
+		df = bq.query_runner('SELECT * FROM t')
+	pool.assert_called_once_with(max_workers=2)
+	assert len(df) == len(partitions)
 #================================================================================#
 
 
 #================================================================================#
-def test_salesforce_extractors():
-	with patch('simple_salesforce.Salesforce', new=MockObjects.mock_sf_client):
-		with patch('salesforce_bulk.SalesforceBulk', new=MockObjects.mock_sf_bulk_client):
-			with patch('etlkit.etlkit.credentials.get_salesforce_creds',
-							new=mock_get_salesforce_creds):
-				from ..etlkit.extractors import SalesforceExtractor
-				sf_simp = SalesforceExtractor(bulk=False, creds_json='test.json')
-				sf_bulk = SalesforceExtractor(bulk=True, creds_json='test.json')
+def test_read_csv_as_strings_multiline(extractors_module):
+	# Several parser blocks' worth of rows, each with a newline inside a quoted value
+	n_rows = 200_000
+	body = b''.join(b'%d,"line one\nline two %d"\n' % (i, i) for i in range(n_rows))
+	raw = b'Id,Description\n' + body
+	assert len(raw) > 4 * 2**20
 
+	table = extractors_module._read_csv_as_strings(raw)
+	assert table.num_rows == n_rows
+	assert table.column_names == ['Id', 'Description']
+	assert str(table.column('Id').type) == 'string'
+	assert table.column('Description')[n_rows-1].as_py() == f'line one\nline two {n_rows-1}'
+#================================================================================#
+
+
+#================================================================================#
+def test_salesforce_extractors(extractors_module, sf_simp, sf_bulk):
+	SalesforceExtractor = extractors_module.SalesforceExtractor
 	for sf in [sf_simp, sf_bulk]:
-		assert hasattr(sf,'client')
-		assert hasattr(sf,'query_runner')
+		assert {'client','query_runner'} <= set(dir(sf))
+
+	# query_runner is a bound method, so compare the underlying functions
+	assert sf_simp.query_runner.__func__ is SalesforceExtractor._simple_query
+	assert sf_bulk.query_runner.__func__ is SalesforceExtractor._bulk_query
+
+#______________________________________________________________________________#
+@pytest.mark.parametrize('n_records', [0, 1, 2, 5])
+def test_simple_query_chunks(extractors_module, n_records):
+	# Chunks of 2 records, so 5 records cross the chunk boundary twice
+	pytest.importorskip('simple_salesforce')
+	SalesforceExtractor = extractors_module.SalesforceExtractor
+	sf = SalesforceExtractor.__new__(SalesforceExtractor)
+	sf.downcast = False
+	sf.client = Mock()
+	sf.client.query_all_iter.return_value = iter(
+		[{'attributes': {'type': 'Account'}, 'Name': f'n{i}', 'Id': str(i)} for i in range(n_records)])
 
-	assert sf_simp.query_runner.__name__ == '_simple_query'
-	assert sf_bulk.query_runner.__name__ == '_bulk_query'
+	with patch.object(extractors_module, 'SIMPLE_QUERY_CHUNK_ROWS', 2):
+		df = sf._simple_query('SELECT Name, Id FROM Account')
+
+	if n_records == 0:
+		assert df.empty and list(df.columns) == []
+		return
+	# The 'attributes' metadata is dropped, and the columns keep the query's order
+	assert list(df.columns) == ['Name', 'Id']
+	assert df['Id'].tolist() == [str(i) for i in range(n_records)]
+	assert df.index.tolist() == list(range(n_records))
+
+#______________________________________________________________________________#
+def test_simple_query_expired_session(extractors_module):
+	# An expired session clears the client cache, logs in again and retries once
+	exceptions = pytest.importorskip('simple_salesforce.exceptions')
+	from ._mock_fixtures import mock_get_salesforce_creds
+	SalesforceExtractor = extractors_module.SalesforceExtractor
+	sf = SalesforceExtractor.__new__(SalesforceExtractor)
+	sf._bulk, sf._creds, sf.downcast = False, mock_get_salesforce_creds(), False
+	sf.client = Mock()
+	sf.client.query_all_iter.side_effect = exceptions.SalesforceExpiredSession('url', 401, 'query', b'')
+	new_client = Mock()
+	new_client.query_all_iter.return_value = iter([{'attributes': {}, 'Id': '1'}])
+
+	with patch.object(extractors_module, '_get_sf_client', return_value=new_client) as get_client:
+		df = sf._simple_query('SELECT Id FROM Account')
+	get_client.cache_clear.assert_called_once()
+	assert sf.client is new_client
+	assert df['Id'].tolist() == ['1']
 #================================================================================#
 
 
 #================================================================================#
 # def test_BigQueryExtractor():
 # 	#_ = clear_cache(['oogle','Credentials'])
-# 	with patch('google.oauth2.service_account.Credentials', new=MockObjects.mock_google_creds):
-# 		with patch('google.cloud.bigquery.Client', new=MockObjects.mock_bq_client):
+# 	with patch('google.oauth2.service_account.Credentials', new=google_creds()):
+# 		with patch('google.cloud.bigquery.Client', new=bq_client()):
 # 			with patch('etlkit.etlkit.credentials.get_bq_creds',
-# 							new=MockObjects.mock_service_account):
+# 							new=service_account()):
 # 				from ..etlkit.extractors import BigQueryExtractor
 # 				bq = BigQueryExtractor(creds_json='test.json')
 # 				assert hasattr(bq,'client')
@@ -83,7 +146,7 @@ def test_salesforce_extractors():
 # 				assert bq.query_runner.__name__ == '_query'
 
 
-# 	with pytest.raises(Exception):
+# 	with pytest.raises(QueryError):
 # 		bq.query_runner('bad query')
 
 	#with pytest.raises(ValueError):
@@ -95,42 +158,104 @@ def test_salesforce_extractors():
 #================================================================================#
 class TestMultiExtractor:
 	# Test methods/attrs
-	def test_mex_methods(self):
-		from ..etlkit.extractors import MultiExtractor
-		me = MultiExtractor()
-		assert hasattr(me,'create_job')
-		assert hasattr(me,'run')
-		assert hasattr(me,'_extract_async')
-		assert hasattr(me,'_run_async')
-		assert hasattr(me,'extractor_jobs')
+	def test_mex_methods(self, extractors_module):
+		me = extractors_module.MultiExtractor()
+		expected = {'create_job','run','_extract_async','_run_async','extractor_jobs','close'}
+		assert expected <= set(dir(me))
 
 	#______________________________________________________________________________#
 	# Test create_job
-	def test_mex_create_job(self):
-		with patch('simple_salesforce.Salesforce', new=MockObjects.mock_sf_client):
-			with patch('etlkit.etlkit.credentials.get_salesforce_creds',
-							new=mock_get_salesforce_creds):
-				from ..etlkit.extractors import SalesforceExtractor, MultiExtractor
-				me = MultiExtractor()
-				me.create_job(query='query',name='name',
-									extractor=SalesforceExtractor(creds_json='test.json'))
+	def test_mex_create_job(self, extractors_module, sf_simp):
+		SalesforceExtractor = extractors_module.SalesforceExtractor
+		me = extractors_module.MultiExtractor()
+		me.create_job(query='query',name='name',extractor=sf_simp)
 
 		assert me.extractor_jobs[0].query == 'query'
 		assert me.extractor_jobs[0].name == 'name'
-		assert me.extractor_jobs[0].extractor.__class__.__name__ == 'SalesforceExtractor'
+		assert type(me.extractor_jobs[0].extractor) is SalesforceExtractor
 		with pytest.raises(TypeError):
 			me.create_job(query='query',name='name',extractor='extractor') # type: ignore
 
 	#______________________________________________________________________________#
 	# Test run
-	def test_mex_run(self):
-		from ..etlkit.extractors import SalesforceExtractor, MultiExtractor
-		mock_sf = Mock(SalesforceExtractor)
-		mock_sf.query_runner = Mock(return_value=pd.DataFrame())
-		me = MultiExtractor()
+	def test_mex_run(self, extractors_module):
+		# A bare instance (skipping __init__) still passes create_job's isinstance check
+		SalesforceExtractor = extractors_module.SalesforceExtractor
+		mock_sf = SalesforceExtractor.__new__(SalesforceExtractor)
+		mock_sf.query_runner = lambda *args, **kwargs: EMPTY_DF
+		me = extractors_module.MultiExtractor()
 		me.create_job(query='query',name='name',extractor=mock_sf)
 		output = me.run()
+		me.close()
+		assert me._executor is None
 		assert isinstance(output,Data)
 		assert hasattr(output,'dataframes')
 		assert output.dataframes['df_name'].empty
+
+	#______________________________________________________________________________#
+	# Test the async run path dispatches to _extract_async
+	def test_mex_run_async(self, extractors_module):
+		expected = Data(dataframes={'df_name': EMPTY_DF})
+		me = extractors_module.MultiExtractor(async_extract=True)
+		with patch.object(me, '_extract_async', AsyncMock(return_value=expected)) as mock_extract:
+			output = me.run()
+		mock_extract.assert_awaited_once()
+		assert output is expected
+
+	#______________________________________________________________________________#
+	# Test the pool is sized from the cap, not the jobs present at the first run
+	def test_mex_executor_size(self, extractors_module):
+		SalesforceExtractor = extractors_module.SalesforceExtractor
+		mock_sf = SalesforceExtractor.__new__(SalesforceExtractor)
+		mock_sf.query_runner = lambda *args, **kwargs: EMPTY_DF
+		with extractors_module.MultiExtractor() as me:
+			me.create_job(query='query',name='first',extractor=mock_sf)
+			me.run()
+			executor = me._executor
+			for i in range(3):
+				me.create_job(query='query',name=f'job{i}',extractor=mock_sf)
+			output = me.run()
+			assert me._executor is executor
+			assert executor._max_workers == extractors_module.MultiExtractor.MAX_WORKERS
+		assert set(output.dataframes) == {'df_first', 'df_job0', 'df_job1', 'df_job2'}
+
+	#______________________________________________________________________________#
+	# Test a failing query is raised rather than exiting
+	@pytest.mark.parametrize('async_extract', [False, True])
+	def test_mex_run_query_error(self, extractors_module, async_extract):
+		QueryError = extractors_module.QueryError
+		mock_sf = Mock(extractors_module.SalesforceExtractor)
+		mock_sf.query_runner = Mock(side_effect=QueryError("Malformed query: query"))
+		with extractors_module.MultiExtractor(async_extract=async_extract) as me:
+			me.create_job(query='query',name='name',extractor=mock_sf)
+			with pytest.raises(QueryError):
+				me.run()
+
+	#______________________________________________________________________________#
+	# Test the SDK errors are translated to QueryError by the real query methods
+	@pytest.mark.parametrize('async_extract', [False, True])
+	@pytest.mark.parametrize('source', ['salesforce', 'bigquery'])
+	def test_mex_run_sdk_error(self, extractors_module, source, async_extract):
+		if source == 'salesforce':
+			exceptions = pytest.importorskip('simple_salesforce.exceptions')
+			SalesforceExtractor = extractors_module.SalesforceExtractor
+			extractor = SalesforceExtractor.__new__(SalesforceExtractor)
+			extractor.client = Mock()
+			extractor.client.query_all_iter.side_effect = \
+				exceptions.SalesforceMalformedRequest('url', 400, 'query', b'MALFORMED_QUERY')
+			extractor.query_runner = extractor._simple_query
+			cause = exceptions.SalesforceMalformedRequest
+		else:
+			extractor = extractors_module.BigQueryExtractor()
+			extractor.client = Mock()
+			extractor.bqstorage_client = None
+			extractor.client.query.side_effect = ValueError('Syntax error')
+			cause = ValueError
+
+		QueryError = extractors_module.QueryError
+		with extractors_module.MultiExtractor(async_extract=async_extract) as me:
+			me.create_job(query='SELECT Id FROM Account', name='name', extractor=extractor)
+			with pytest.raises(QueryError) as excinfo:
+				me.run()
+		assert isinstance(excinfo.value.__cause__, cause)
 #================================================================================#
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+from pandas import DataFrame, Timestamp
+from ..etlkit._proto import UnsupportedSchemaError, proto_row_class, proto_frame, serialize_rows
+
+pytest.importorskip('google.protobuf')
+bigquery = pytest.importorskip('google.cloud.bigquery')
+
+SCHEMA = [
+	bigquery.SchemaField('name',    'STRING'),
+	bigquery.SchemaField('count',   'INTEGER'),
+	bigquery.SchemaField('score',   'FLOAT'),
+	bigquery.SchemaField('active',  'BOOLEAN'),
+	bigquery.SchemaField('created', 'TIMESTAMP'),
+]
+
+
+#================================================================================#
+def test_proto_row_class():
+	descriptor, row_class = proto_row_class(SCHEMA)
+	assert [field.name for field in descriptor.field] == [field.name for field in SCHEMA]
+
+	row = row_class(name='a', count=1, score=0.5, active=True, created=0)
+	assert row_class.FromString(row.SerializeToString()) == row
+
+#______________________________________________________________________________#
+@pytest.mark.parametrize('field', [
+	bigquery.SchemaField('tags', 'STRING', mode='REPEATED'),
+	bigquery.SchemaField('geo', 'GEOGRAPHY'),
+	bigquery.SchemaField('bad-name', 'STRING'),
+])
+def test_proto_row_class_unsupported(field):
+	with pytest.raises(UnsupportedSchemaError):
+		proto_row_class([field])
+#================================================================================#
+
+
+#================================================================================#
+def test_proto_frame_converts_strings():
+	# An all-string frame, like the bulk extractor returns
+	df = DataFrame({
+		'name':    ['a', '', None],
+		'count':   ['1', '2.0', ''],
+		'score':   ['1.5', '', '3'],
+		'active':  ['true', 'FALSE', ''],
+		'created': ['1970-01-01T00:00:01Z', '', '1970-01-01T00:00:00.000002Z'],
+	})
+	typed = proto_frame(df, SCHEMA)
+
+	assert typed['name'].tolist()[:2] == ['a', ''] # empty strings are kept for STRING
+	assert typed['name'].isna().tolist() == [False, False, True]
+	assert typed['count'].isna().tolist() == [False, False, True]
+	assert typed['count'].tolist()[:2] == [1, 2]
+	assert typed['score'].tolist()[0] == 1.5 and typed['score'].isna()[1]
+	assert typed['active'].tolist()[:2] == [True, False] and typed['active'].isna()[2]
+	# Timestamps as microseconds since the epoch
+	assert typed['created'].tolist()[0] == 1_000_000
+	assert typed['created'].isna()[1]
+	assert typed['created'].tolist()[2] == 2
+
+#______________________________________________________________________________#
+def test_proto_frame_typed_values():
+	df = DataFrame({
+		'count':   np.array([1, 2], dtype=np.int64),
+		'score':   [np.nan, 2.5],
+		'created': [Timestamp('1970-01-01 00:00:01'), None],
+	})
+	typed = proto_frame(df, SCHEMA)
+	assert typed['count'].tolist() == [1, 2]
+	assert typed['score'].isna().tolist() == [True, False]
+	assert typed['created'].tolist()[0] == 1_000_000
+	assert typed['created'].isna()[1]
+
+#______________________________________________________________________________#
+@pytest.mark.parametrize('column, values', [
+	('count',   ['1.5', '2']),
+	('count',   ['abc', '2']),
+	('score',   ['x', '1.0']),
+	('active',  ['yes', 'true']),
+	('created', ['not a date', '']),
+])
+def test_proto_frame_bad_values(column, values):
+	with pytest.raises(UnsupportedSchemaError):
+		proto_frame(DataFrame({column: values}), SCHEMA)
+
+#______________________________________________________________________________#
+def test_proto_frame_unknown_columns():
+	with pytest.raises(UnsupportedSchemaError, match='extra'):
+		proto_frame(DataFrame({'name': ['a'], 'extra': [1]}), SCHEMA)
+#================================================================================#
+
+
+#================================================================================#
+def test_serialize_rows():
+	_, row_class = proto_row_class(SCHEMA)
+	df = DataFrame({'name': ['a', None], 'count': ['3', ''], 'active': ['true', 'false']})
+	rows = [row_class.FromString(raw) for raw in serialize_rows(proto_frame(df, SCHEMA), row_class)]
+
+	assert rows[0].name == 'a' and rows[0].count == 3 and rows[0].active is True
+	# Nulls are left unset, rather than written as defaults
+	assert not rows[1].HasField('name')
+	assert not rows[1].HasField('count')
+	assert rows[1].HasField('active') and rows[1].active is False
+	assert not rows[0].HasField('score')
+#================================================================================#
@@ -1,6 +1,6 @@
 import pytest
-from typing import Callable
-from ..etlkit.templates import generic_check_handler, generic_checker
+from pandas import Series
+from ..etlkit.templates import generic_check_handler, generic_checker, _unique_id_ok
 from ..etlkit.templates import ExtractTemplate, TransformTemplate, LoadTemplate
 
 
@@ -17,16 +17,24 @@ class TestCheckersAndHandlers:
 		assert generic_checker(*tests[1]) == KeyError
 
 	def test_handler(self):
-		with pytest.raises(Exception):
+		# The handler raises a plain Exception, listing the failed checks' types
+		with pytest.raises(Exception, match='KeyError') as excinfo:
 			generic_check_handler(self.tests)
+		assert excinfo.type is Exception
+
+	def test_unique_id_ok(self):
+		assert _unique_id_ok(Series(['a', 'b', 'c']))
+		assert not _unique_id_ok(Series(['a', 'b', 'a']))
+		assert _unique_id_ok(Series(['a']))
 #=====================================================================#
 
 #=====================================================================#
-def test_ETLTemplates():
-	templates = [ExtractTemplate, TransformTemplate, LoadTemplate]
-	for template in templates:
-		class Template(template):
-			pass
-		temp = Template()
-		assert hasattr(temp,'run')
-		assert isinstance(temp.run, Callable)
+# Concrete subclasses of each template, built once at collection
+_SUBCLASSES = [type(f'Template{T.__name__}', (T,), {})
+								for T in (ExtractTemplate, TransformTemplate, LoadTemplate)]
+
+@pytest.mark.parametrize('cls', _SUBCLASSES)
+def test_ETLTemplates(cls):
+	temp = cls()
+	assert hasattr(temp,'run')
+	assert callable(temp.run)